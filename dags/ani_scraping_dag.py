@@ -4,10 +4,15 @@ ani_scraping_dag.py — DAG de Airflow para el scraping de normativas ANI.
 Secuencia:
   create_tables → extract → validate → write
 
-Comunicación entre tareas vía XCom (JSON).
+extract, validate y write son tareas mapeadas (dynamic task mapping):
+hay una instancia por lote de ANI_PAGES_PER_TASK páginas, de modo que
+cada lote se valida y escribe por separado.
+
+Los registros viajan entre tareas como archivos Parquet en DATA_DIR;
+por XCom solo se comparte la ruta del archivo. Cada archivo se borra
+cuando la tarea que lo consume termina bien.
 """
 
-import json
 import os
 from datetime import datetime, timedelta
 
@@ -15,6 +20,7 @@ from airflow import DAG
 from airflow.operators.python import PythonOperator
 
 from config import settings
+from utils import MAX_SCRAPING_WORKERS
 
 # ---------------------------------------------------------------------------
 # Argumentos por defecto del DAG
@@ -32,8 +38,61 @@ default_args = {
 # Configuración del pipeline (centralizada en config.py)
 # ---------------------------------------------------------------------------
 NUM_PAGES = settings.ani_num_pages
+PAGES_PER_TASK = max(1, settings.ani_pages_per_task)
 RULES_PATH = settings.validation_rules_path
 INIT_SQL_PATH = settings.init_sql_path
+DATA_DIR = settings.data_dir
+
+# Lotes de páginas: una instancia mapeada de extract por lote
+PAGE_BATCHES = [
+    {"first_page": first_page, "num_pages": min(PAGES_PER_TASK, NUM_PAGES - first_page)}
+    for first_page in range(0, NUM_PAGES, PAGES_PER_TASK)
+]
+
+# Concurrencia de las tareas mapeadas. Cada extract descarga sus
+# PAGES_PER_TASK páginas en paralelo, así que se limitan las instancias
+# simultáneas para que el total no supere MAX_SCRAPING_WORKERS. Las escrituras
+# se serializan para que cada lote vea los registros ya insertados por los
+# anteriores.
+MAX_ACTIVE_EXTRACT_TASKS = max(1, MAX_SCRAPING_WORKERS // PAGES_PER_TASK)
+MAX_ACTIVE_WRITE_TASKS = 1
+
+# Objetos creados por init.sql; si todos existen se omite el DDL
+SCHEMA_OBJECTS = [
+    "public.regulations",
+    "public.regulations_component",
+    "public.dapper_regulations_regulations",
+]
+
+
+# ---------------------------------------------------------------------------
+# Intercambio de registros entre tareas (Parquet)
+# ---------------------------------------------------------------------------
+def _save_records(records, context, stage: str) -> str:
+    """Escribe los registros del lote en un Parquet y retorna su ruta."""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    os.makedirs(DATA_DIR, exist_ok=True)
+    file_name = f"{context['run_id']}_{stage}_{context['ti'].map_index}.parquet"
+    path = os.path.join(DATA_DIR, file_name)
+    pq.write_table(pa.Table.from_pylist(records), path)
+    return path
+
+
+def _load_records(path: str):
+    """Lee los registros de un Parquet generado por _save_records."""
+    import pyarrow.parquet as pq
+
+    return pq.read_table(path).to_pylist()
+
+
+def _remove_records(path: str) -> None:
+    """Borra un Parquet ya consumido (ignora si ya no existe)."""
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
 
 
 # ---------------------------------------------------------------------------
@@ -47,66 +106,71 @@ def task_create_tables(**context):
 
     logger = logging.getLogger("ani_scraping.create_tables")
 
-    # Buscar init.sql en varias ubicaciones posibles
-    sql_path = INIT_SQL_PATH
-    if not os.path.exists(sql_path):
-        # Fallback: buscar en configs/
-        alt_path = "/opt/airflow/configs/init.sql"
-        if os.path.exists(alt_path):
-            sql_path = alt_path
-        else:
-            logger.warning("No se encontró init.sql — las tablas deben existir previamente.")
-            return
-
-    with open(sql_path, "r", encoding="utf-8") as f:
-        ddl = f.read()
-
     db = DatabaseManager()
     if not db.connect():
         raise RuntimeError("No se pudo conectar a la BD para crear tablas")
 
     try:
+        # Verificación barata: si el esquema ya existe no se lee ni ejecuta el DDL
+        result = db.execute_query(
+            "SELECT bool_and(to_regclass(name) IS NOT NULL) FROM unnest(%s::text[]) AS name",
+            (SCHEMA_OBJECTS,),
+        )
+        if result[0][0]:
+            logger.info("Esquema ya presente — se omite init.sql.")
+            return
+
+        # Buscar init.sql en varias ubicaciones posibles
+        sql_path = INIT_SQL_PATH
+        if not os.path.exists(sql_path):
+            # Fallback: buscar en configs/
+            alt_path = "/opt/airflow/configs/init.sql"
+            if os.path.exists(alt_path):
+                sql_path = alt_path
+            else:
+                logger.warning("No se encontró init.sql — las tablas deben existir previamente.")
+                return
+
+        with open(sql_path, "r", encoding="utf-8") as f:
+            ddl = f.read()
+
         db.execute_ddl(ddl)
         logger.info("Tablas creadas / verificadas exitosamente.")
     finally:
         db.close()
 
 
-def task_extract(**context):
-    """Extrae datos del sitio de la ANI."""
+def task_extract(first_page: int, num_pages: int, **context):
+    """Extrae un lote de páginas del sitio de la ANI."""
     from extraction import run_extraction
 
-    records = run_extraction(num_pages=NUM_PAGES)
+    records = run_extraction(num_pages=num_pages, first_page=first_page)
 
-    # Serializar a JSON para XCom
-    context["ti"].xcom_push(key="raw_records", value=json.dumps(records, default=str))
-    return len(records)
+    # Solo la ruta del archivo pasa por XCom (op_kwargs de validate)
+    return {"raw_path": _save_records(records, context, "raw")}
 
 
-def task_validate(**context):
-    """Valida los registros extraídos según reglas YAML."""
+def task_validate(raw_path: str, **context):
+    """Valida los registros extraídos de un lote según reglas YAML."""
     from validation import run_validation
 
-    # Recuperar datos del paso anterior
-    raw_json = context["ti"].xcom_pull(task_ids="extract", key="raw_records")
-    records = json.loads(raw_json)
-
+    records = _load_records(raw_path)
     validated = run_validation(records, rules_path=RULES_PATH)
 
-    # Serializar para el siguiente paso
-    context["ti"].xcom_push(key="validated_records", value=json.dumps(validated, default=str))
-    return len(validated)
+    # Solo la ruta del archivo pasa por XCom (op_kwargs de write)
+    validated_path = _save_records(validated, context, "validated")
+    _remove_records(raw_path)
+    return {"validated_path": validated_path}
 
 
-def task_write(**context):
-    """Escribe los registros validados en PostgreSQL."""
+def task_write(validated_path: str, **context):
+    """Escribe los registros validados de un lote en PostgreSQL."""
     from writing import run_writing
 
-    # Recuperar datos validados
-    validated_json = context["ti"].xcom_pull(task_ids="validate", key="validated_records")
-    records = json.loads(validated_json)
+    records = _load_records(validated_path)
 
     inserted = run_writing(records)
+    _remove_records(validated_path)
     return inserted
 
 
@@ -128,20 +192,22 @@ with DAG(
         python_callable=task_create_tables,
     )
 
-    extract = PythonOperator(
+    extract = PythonOperator.partial(
         task_id="extract",
         python_callable=task_extract,
-    )
+        max_active_tis_per_dag=MAX_ACTIVE_EXTRACT_TASKS,
+    ).expand(op_kwargs=PAGE_BATCHES)
 
-    validate = PythonOperator(
+    validate = PythonOperator.partial(
         task_id="validate",
         python_callable=task_validate,
-    )
+    ).expand(op_kwargs=extract.output)
 
-    write = PythonOperator(
+    write = PythonOperator.partial(
         task_id="write",
         python_callable=task_write,
-    )
+        max_active_tis_per_dag=MAX_ACTIVE_WRITE_TASKS,
+    ).expand(op_kwargs=validate.output)
 
     # Secuencia: crear tablas → extraer → validar → escribir
     create_tables >> extract >> validate >> write
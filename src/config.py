@@ -29,10 +29,12 @@ class Settings(BaseSettings):
 
     # --- Aplicación ----------------------------------------------------------
     ani_num_pages: int = 9
+    ani_pages_per_task: int = 3
     validation_rules_path: str = str(
         Path(__file__).resolve().parent.parent / "configs" / "validation_rules.yaml"
     )
     init_sql_path: str = "/opt/airflow/configs/init.sql"
+    data_dir: str = "/opt/airflow/data"
 
     @property
     def db_config(self) -> dict:
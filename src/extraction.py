@@ -2,20 +2,30 @@
 extraction.py — Módulo de extracción (scraping).
 
 Contiene toda la lógica de scraping del sitio de la ANI.
-La lógica de extracción se mantiene intacta respecto al código original.
+Las páginas se parsean con lxml y cada campo se ubica con expresiones
+XPath compiladas una sola vez al importar el módulo.
 """
 
+import io
 import logging
+import re
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
-from typing import Dict, List
+from typing import Dict, Iterator, List
 
 import requests
-from bs4 import BeautifulSoup
+from lxml import etree
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 from utils import (
     ENTITY_VALUE,
     FIXED_CLASSIFICATION_ID,
+    MAX_SCRAPING_WORKERS,
+    MAX_TITLE_LENGTH,
+    PAGE_ENCODING,
     URL_BASE,
+    USER_AGENT,
     clean_quotes,
     get_rtype_id,
     is_valid_created_at,
@@ -24,6 +34,122 @@ from utils import (
 logger = logging.getLogger("ani_scraping.extraction")
 
 
+# ---------------------------------------------------------------------------
+# Sesión HTTP compartida
+# ---------------------------------------------------------------------------
+def _build_session() -> requests.Session:
+    """
+    Crea la sesión HTTP reutilizada por todas las páginas.
+
+    El pool de conexiones mantiene vivas las conexiones TCP/TLS entre
+    solicitudes (keep-alive) y se dimensiona para los hilos de extracción.
+    """
+    session = requests.Session()
+    adapter = HTTPAdapter(
+        pool_connections=MAX_SCRAPING_WORKERS,
+        pool_maxsize=MAX_SCRAPING_WORKERS,
+        max_retries=Retry(total=2, backoff_factor=0.3, status_forcelist=[502, 503, 504]),
+    )
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    # requests ya anuncia gzip/deflate (y br si brotli está instalado)
+    session.headers.update({"User-Agent": USER_AGENT, "Accept": "text/html"})
+    return session
+
+
+_SESSION = _build_session()
+
+# Formatos de fecha del sitio: ISO ('2024-03-05T00:00:00-05:00') y 'd/m/aaaa'
+_ISO_DATE_RE = re.compile(r"^(\d{4}-\d{2}-\d{2})")
+_DMY_DATE_RE = re.compile(r"^(\d{1,2})/(\d{1,2})/(\d{4})")
+
+# Estructura base de cada registro (se copia por fila)
+_NORMA_TEMPLATE = {
+    "created_at": None,
+    "update_at": None,
+    "is_active": True,
+    "title": None,
+    "gtype": None,
+    "entity": ENTITY_VALUE,
+    "external_link": None,
+    "rtype_id": None,
+    "summary": None,
+    "classification_id": FIXED_CLASSIFICATION_ID,
+}
+
+
+# ---------------------------------------------------------------------------
+# Expresiones XPath precompiladas
+# ---------------------------------------------------------------------------
+def _cell_xpath(css_class: str) -> etree.XPath:
+    """XPath de las celdas <td> de una fila que tengan la clase indicada."""
+    return etree.XPath(
+        f".//td[contains(concat(' ', normalize-space(@class), ' '), ' {css_class} ')]"
+    )
+
+
+_XP_TITLE_CELL = _cell_xpath("views-field-title")
+_XP_SUMMARY_CELL = _cell_xpath("views-field-body")
+_XP_FECHA_CELL = _cell_xpath("views-field-field-fecha--1")
+_XP_LINK = etree.XPath(".//a")
+_XP_FECHA_SPAN = etree.XPath(
+    ".//span[contains(concat(' ', normalize-space(@class), ' '), ' date-display-single ')]"
+)
+
+
+def _first(xpath: etree.XPath, element):
+    """Retorna el primer resultado de un XPath o None."""
+    result = xpath(element)
+    return result[0] if result else None
+
+
+def _iter_rows(response: requests.Response) -> Iterator[etree._Element]:
+    """
+    Recorre las filas <tr> del primer <tbody> de la página en streaming.
+
+    Usa iterparse en lugar de construir el documento completo: cada fila
+    se libera después de procesarla y el parseo se detiene al cerrar ese
+    <tbody>. Las filas de tablas anidadas dentro de una celda quedan como
+    parte de la fila que las contiene. Sin charset en Content-Type se
+    asume UTF-8 (codificación del sitio de la ANI).
+    """
+    content_type = response.headers.get("Content-Type", "").lower()
+    encoding = response.encoding if "charset=" in content_type else PAGE_ENCODING
+
+    events = etree.iterparse(
+        io.BytesIO(response.content),
+        events=("start", "end"),
+        tag=("tr", "tbody"),
+        html=True,
+        encoding=encoding,
+    )
+    results_body = None
+    for event, element in events:
+        if element.tag == "tbody":
+            if event == "start" and results_body is None:
+                results_body = element  # Solo interesa la tabla de resultados
+            elif event == "end" and element is results_body:
+                return
+            continue
+
+        if event != "end" or results_body is None:
+            continue
+        if next(element.iterancestors("tbody"), None) is not results_body:
+            continue  # Filas de <thead> o de tablas anidadas
+
+        yield element
+
+        # Liberar la fila ya procesada y las anteriores
+        element.clear()
+        while element.getprevious() is not None:
+            del element.getparent()[0]
+
+
+def _text(element) -> str:
+    """Texto del elemento sin espacios en cada fragmento (como get_text(strip=True))."""
+    return "".join(piece.strip() for piece in element.itertext())
+
+
 # ---------------------------------------------------------------------------
 # Funciones de extracción por campo
 # ---------------------------------------------------------------------------
@@ -34,24 +160,36 @@ def extract_title_and_link(row, norma_data: dict, verbose: bool, row_num: int) -
     Returns:
         True si se extrajo correctamente, False si debe saltarse.
     """
-    title_cell = row.find("td", class_="views-field views-field-title")
-    if not title_cell:
+    title_cell = _first(_XP_TITLE_CELL, row)
+    if title_cell is None:
         if verbose:
             logger.debug("No se encontró celda de título en la fila %d. Saltando.", row_num)
         return False
 
-    title_link = title_cell.find("a")
-    if not title_link:
+    title_link = _first(_XP_LINK, title_cell)
+    if title_link is None:
         if verbose:
             logger.debug("No se encontró enlace en la fila %d. Saltando.", row_num)
         return False
 
     # Procesar título
-    raw_title = title_link.get_text(strip=True)
+    raw_title = _text(title_link)
+
+    # Descarte temprano: clean_quotes solo quita comillas y espacios, así que
+    # un título crudo de más del doble del máximo no puede quedar dentro
+    # del límite en la práctica y no vale la pena limpiarlo.
+    if len(raw_title) > 2 * MAX_TITLE_LENGTH:
+        if verbose:
+            logger.debug(
+                "Saltando norma con título demasiado largo: '%s' (longitud cruda: %d)",
+                raw_title, len(raw_title),
+            )
+        return False
+
     cleaned_title = clean_quotes(raw_title)
 
     # Validar longitud del título
-    if len(cleaned_title) > 65:
+    if len(cleaned_title) > MAX_TITLE_LENGTH:
         if verbose:
             logger.debug(
                 "Saltando norma con título demasiado largo: '%s' (longitud: %d)",
@@ -83,9 +221,9 @@ def extract_title_and_link(row, norma_data: dict, verbose: bool, row_num: int) -
 
 def extract_summary(row, norma_data: dict) -> None:
     """Extrae el resumen/descripción de una fila."""
-    summary_cell = row.find("td", class_="views-field views-field-body")
-    if summary_cell:
-        raw_summary = summary_cell.get_text(strip=True)
+    summary_cell = _first(_XP_SUMMARY_CELL, row)
+    if summary_cell is not None:
+        raw_summary = _text(summary_cell)
         cleaned_summary = clean_quotes(raw_summary)
         formatted_summary = cleaned_summary.capitalize()
         norma_data["summary"] = formatted_summary
@@ -100,24 +238,23 @@ def extract_creation_date(row, norma_data: dict, verbose: bool, row_num: int) ->
     Returns:
         True si se extrajo correctamente, False si debe saltarse.
     """
-    fecha_cell = row.find("td", class_="views-field views-field-field-fecha--1")
-    if fecha_cell:
-        fecha_span = fecha_cell.find("span", class_="date-display-single")
-        if fecha_span:
-            created_at_raw = fecha_span.get("content", fecha_span.get_text(strip=True))
+    fecha_cell = _first(_XP_FECHA_CELL, row)
+    if fecha_cell is not None:
+        fecha_span = _first(_XP_FECHA_SPAN, fecha_cell)
+        if fecha_span is not None:
+            created_at_raw = fecha_span.get("content", _text(fecha_span))
             # Procesar diferentes formatos de fecha
-            if "T" in created_at_raw:
-                norma_data["created_at"] = created_at_raw.split("T")[0]
-            elif "/" in created_at_raw:
-                try:
-                    day, month, year = created_at_raw.split("/")
-                    norma_data["created_at"] = f"{year}-{month.zfill(2)}-{day.zfill(2)}"
-                except Exception:
-                    norma_data["created_at"] = created_at_raw
+            iso_match = _ISO_DATE_RE.match(created_at_raw)
+            dmy_match = None if iso_match else _DMY_DATE_RE.match(created_at_raw)
+            if iso_match:
+                norma_data["created_at"] = iso_match.group(1)
+            elif dmy_match:
+                day, month, year = dmy_match.groups()
+                norma_data["created_at"] = f"{year}-{month.zfill(2)}-{day.zfill(2)}"
             else:
                 norma_data["created_at"] = created_at_raw
         else:
-            norma_data["created_at"] = fecha_cell.get_text(strip=True)
+            norma_data["created_at"] = _text(fecha_cell)
     else:
         norma_data["created_at"] = None
 
@@ -158,39 +295,19 @@ def scrape_page(page_num: int, verbose: bool = False) -> List[Dict]:
 
     try:
         # Realizar solicitud HTTP
-        response = requests.get(page_url, timeout=15)
+        response = _SESSION.get(page_url, timeout=15)
         response.raise_for_status()
 
-        # Parsear HTML
-        soup = BeautifulSoup(response.content, "html.parser")
-        tbody = soup.find("tbody")
-
-        if not tbody:
-            if verbose:
-                logger.info("No se encontró tabla en página %d", page_num)
-            return []
-
-        rows = tbody.find_all("tr")
-        if verbose:
-            logger.info("Encontradas %d filas en página %d", len(rows), page_num)
-
-        # Procesar filas
+        # Procesar filas a medida que se parsean
+        # (todas comparten la marca de actualización)
+        update_at = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
         page_data = []
-        for i, row in enumerate(rows, 1):
+        i = 0
+        for i, row in enumerate(_iter_rows(response), 1):
             try:
                 # Estructura base del registro
-                norma_data = {
-                    "created_at": None,
-                    "update_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-                    "is_active": True,
-                    "title": None,
-                    "gtype": None,
-                    "entity": ENTITY_VALUE,
-                    "external_link": None,
-                    "rtype_id": None,
-                    "summary": None,
-                    "classification_id": FIXED_CLASSIFICATION_ID,
-                }
+                norma_data = _NORMA_TEMPLATE.copy()
+                norma_data["update_at"] = update_at
 
                 # Extraer datos
                 if not extract_title_and_link(row, norma_data, verbose, i):
@@ -213,6 +330,14 @@ def scrape_page(page_num: int, verbose: bool = False) -> List[Dict]:
                     )
                 continue
 
+        if not i:
+            if verbose:
+                logger.info("No se encontró tabla en página %d", page_num)
+            return []
+
+        if verbose:
+            logger.info("Encontradas %d filas en página %d", i, page_num)
+
         return page_data
 
     except requests.RequestException as e:
@@ -226,28 +351,50 @@ def scrape_page(page_num: int, verbose: bool = False) -> List[Dict]:
 # ---------------------------------------------------------------------------
 # Punto de entrada del módulo
 # ---------------------------------------------------------------------------
-def run_extraction(num_pages: int = 9) -> List[Dict]:
+def run_extraction(
+    num_pages: int = 9,
+    max_workers: int = MAX_SCRAPING_WORKERS,
+    first_page: int = 0,
+) -> List[Dict]:
     """
-    Ejecuta la extracción completa de *num_pages* páginas.
+    Ejecuta la extracción de *num_pages* páginas a partir de *first_page*.
+
+    Las páginas se descargan en paralelo con un pool de hilos acotado a
+    *max_workers*; los resultados se reensamblan en orden de página.
 
     Returns:
         Lista de diccionarios con todos los registros extraídos.
     """
-    logger.info("Iniciando extracción — páginas a procesar: %d", num_pages)
-
-    all_records = []  # type: List[Dict]
-
-    for page_num in range(num_pages):
-        logger.info("Procesando página %d/%d …", page_num + 1, num_pages)
-        page_data = scrape_page(page_num, verbose=True)
-        all_records.extend(page_data)
+    logger.info(
+        "Iniciando extracción — páginas a procesar: %d (desde la página %d)",
+        num_pages, first_page,
+    )
 
-        # Indicador de progreso cada 3 páginas
-        if (page_num + 1) % 3 == 0:
-            logger.info(
-                "Procesadas %d/%d páginas. Registros válidos hasta ahora: %d",
-                page_num + 1, num_pages, len(all_records),
-            )
+    if num_pages <= 0:
+        return []
 
+    results = [[] for _ in range(num_pages)]  # type: List[List[Dict]]
+    completed = 0
+    total_records = 0
+
+    with ThreadPoolExecutor(max_workers=min(num_pages, max_workers)) as executor:
+        futures = {
+            executor.submit(scrape_page, first_page + offset, True): offset
+            for offset in range(num_pages)
+        }
+        for future in as_completed(futures):
+            offset = futures[future]
+            results[offset] = future.result()
+            completed += 1
+            total_records += len(results[offset])
+
+            # Indicador de progreso cada 3 páginas
+            if completed % 3 == 0:
+                logger.info(
+                    "Procesadas %d/%d páginas. Registros válidos hasta ahora: %d",
+                    completed, num_pages, total_records,
+                )
+
+    all_records = [record for page_data in results for record in page_data]
     logger.info("Extracción finalizada — total registros extraídos: %d", len(all_records))
     return all_records
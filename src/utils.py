@@ -22,11 +22,17 @@ logger = logging.getLogger("ani_scraping")
 # ---------------------------------------------------------------------------
 ENTITY_VALUE = "Agencia Nacional de Infraestructura"
 FIXED_CLASSIFICATION_ID = 13
+MAX_TITLE_LENGTH = 65
 URL_BASE = (
     r"https://www.ani.gov.co/informacion-de-la-ani/normatividad"
     r"?field_tipos_de_normas__tid=12&title=&body_value="
     r"&field_fecha__value%5Bvalue%5D%5Byear%5D="
 )
+PAGE_ENCODING = "utf-8"
+USER_AGENT = "Mozilla/5.0 (compatible; ani-scraping/0.1)"
+# Máximo de páginas descargadas en paralelo contra ani.gov.co (evita
+# saturarlo); el DAG reparte este cupo entre las tareas de extracción
+MAX_SCRAPING_WORKERS = 8
 
 # Clasificaciones de documentos
 CLASSIFICATION_KEYWORDS = {
@@ -40,36 +46,40 @@ DEFAULT_RTYPE_ID = 14
 # ---------------------------------------------------------------------------
 # Funciones auxiliares
 # ---------------------------------------------------------------------------
+# Comillas tipográficas y rectas eliminadas por clean_quotes
+_QUOTE_CHARS = (
+    "\u201C\u201D\u2018\u2019\u00AB\u00BB\u201E\u201A\u2039\u203A"
+    "\u2032\u2033\"'´`"
+)
+_QUOTE_TABLE = str.maketrans("", "", _QUOTE_CHARS)
+
+
 def clean_quotes(text: str) -> str:
-    """Elimina todos los tipos de comillas de un texto."""
+    """Elimina todos los tipos de comillas de un texto y normaliza espacios."""
     if not text:
         return text
+    return " ".join(text.translate(_QUOTE_TABLE).split())
 
-    quotes_map = {
-        "\u201C": "", "\u2018": "", "\u2019": "", "\u00AB": "", "\u00BB": "",
-        "\u201E": "", "\u201A": "", "\u2039": "", "\u203A": "", '"': "",
-        "'": "", "´": "", "`": "", "′": "", "″": "",
-    }
-    cleaned_text = text
-    for quote_char, replacement in quotes_map.items():
-        cleaned_text = cleaned_text.replace(quote_char, replacement)
-
-    quotes_pattern = (
-        r'["\'\u201C\u201D\u2018\u2019\u00AB\u00BB'
-        r"\u201E\u201A\u2039\u203A\u2032\u2033]"
-    )
-    cleaned_text = re.sub(quotes_pattern, "", cleaned_text)
-    cleaned_text = cleaned_text.strip()
-    cleaned_text = " ".join(cleaned_text.split())
-    return cleaned_text
+
+# Una sola pasada sobre el título para todas las palabras clave
+_RTYPE_RE = re.compile(
+    "|".join(re.escape(keyword) for keyword in CLASSIFICATION_KEYWORDS),
+    re.IGNORECASE,
+)
 
 
 def get_rtype_id(title: str) -> int:
-    """Obtiene el rtype_id basado en el título del documento."""
-    title_lower = title.lower()
-    for keyword, rtype_id in CLASSIFICATION_KEYWORDS.items():
-        if keyword in title_lower:
-            return rtype_id
+    """
+    Obtiene el rtype_id basado en el título del documento.
+
+    Si aparecen varias palabras clave, prevalece el orden de
+    CLASSIFICATION_KEYWORDS.
+    """
+    found = {match.lower() for match in _RTYPE_RE.findall(title)}
+    if found:
+        for keyword, rtype_id in CLASSIFICATION_KEYWORDS.items():
+            if keyword in found:
+                return rtype_id
     return DEFAULT_RTYPE_ID
 
 
@@ -8,11 +8,13 @@ ubicado en configs/validation_rules.yaml.
 Comportamiento:
   - Campo que no cumple → queda como None.
   - Fila cuyo(s) campo(s) obligatorio(s) no cumple(n) → se descarta entera.
+
+run_validation aplica cada regla sobre la lista de valores de un campo.
 """
 
 import logging
 import re
-from typing import Dict, List, Optional, Tuple
+from typing import Dict, List, Optional
 
 import yaml
 
@@ -38,13 +40,13 @@ def load_rules(path: Optional[str] = None) -> Dict:
         config = yaml.safe_load(f)
 
     fields = config.get("fields", {})
+    for rule in fields.values():
+        _compile_rule(rule)
+
     logger.info("Reglas cargadas para %d campos: %s", len(fields), list(fields.keys()))
     return fields
 
 
-# ---------------------------------------------------------------------------
-# Validación de un campo individual
-# ---------------------------------------------------------------------------
 _TYPE_MAP = {
     "str": str,
     "int": int,
@@ -53,67 +55,62 @@ _TYPE_MAP = {
 }
 
 
-def _validate_field(value, rule: Dict) -> Tuple:
-    """
-    Valida un valor según su regla.
-
-    Returns:
-        (is_valid, cleaned_value)
-        - is_valid=True  → el valor cumple; cleaned_value es el mismo valor.
-        - is_valid=False → el valor NO cumple; cleaned_value es None.
-    """
-    # Si el valor es None / vacío, solo importa la obligatoriedad (se maneja afuera)
-    if value is None:
-        return False, None
-
-    # --- Verificar tipo ---
-    expected_type_name = rule.get("type")
-    if expected_type_name:
-        expected_type = _TYPE_MAP.get(expected_type_name)
-        if expected_type and not isinstance(value, expected_type):
-            # Intentar castear
-            try:
-                value = expected_type(value)
-            except (ValueError, TypeError):
-                return False, None
-
-    # --- Verificar regex ---
+def _compile_rule(rule: Dict) -> None:
+    """Pre-resuelve el tipo y compila el regex de una regla (una sola vez)."""
+    rule["_expected_type"] = _TYPE_MAP.get(rule.get("type"))
     regex = rule.get("regex")
-    if regex and isinstance(value, str):
-        if not re.match(regex, value):
-            return False, None
-
-    return True, value
+    rule["_regex_compiled"] = re.compile(regex) if regex else None
 
 
 # ---------------------------------------------------------------------------
-# Validación de un registro completo
+# Validación por campo
 # ---------------------------------------------------------------------------
-def validate_record(record: Dict, rules: Dict) -> Optional[Dict]:
+def _cast_value(value, expected_type):
+    """Castea un valor al tipo esperado; retorna None si no es posible."""
+    try:
+        return expected_type(value)
+    except (ValueError, TypeError):
+        return None
+
+
+def validate_values(values: List, rule: Dict) -> List[bool]:
     """
-    Valida un registro individual.
+    Valida en sitio la lista de valores de un campo según su regla.
+
+    Los valores casteados reemplazan a los originales y los inválidos
+    quedan como None.
 
     Returns:
-        Registro limpio (campos inválidos → None) o None si un campo
-        obligatorio no cumple.
+        Lista con True en las posiciones cuyo valor cumple la regla.
     """
-    cleaned = dict(record)  # copia superficial
-
-    for field_name, rule in rules.items():
-        value = cleaned.get(field_name)
-        is_valid, new_value = _validate_field(value, rule)
-
-        if not is_valid:
-            required = rule.get("required", False)
-            if required:
-                # Campo obligatorio no cumple → descartar fila
-                return None
-            # Campo opcional no cumple → dejar como None
-            cleaned[field_name] = None
+    valid = [value is not None for value in values]
+
+    # --- Verificar tipo (solo se castean los valores de otro tipo) ---
+    expected_type = rule["_expected_type"]
+    if expected_type:
+        for i, value in enumerate(values):
+            if value is not None and not isinstance(value, expected_type):
+                values[i] = _cast_value(value, expected_type)
+                valid[i] = values[i] is not None
+
+    # --- Verificar regex (solo aplica a valores str) ---
+    # pattern.match se aplica con un solo map sobre los str del campo; el
+    # campo se recorre de nuevo solo si algún valor no cumple.
+    pattern = rule["_regex_compiled"]
+    if pattern:
+        if expected_type is str and None not in values:
+            strings = values  # Tras el casteo todos los valores son str
         else:
-            cleaned[field_name] = new_value
+            strings = [value for value in values if isinstance(value, str)]
+        matches = list(map(pattern.match, strings))
+        if None in matches:
+            pending = iter(matches)
+            for i, value in enumerate(values):
+                if isinstance(value, str) and next(pending) is None:
+                    valid[i] = False
+                    values[i] = None
 
-    return cleaned
+    return valid
 
 
 # ---------------------------------------------------------------------------
@@ -123,6 +120,11 @@ def run_validation(records: List[Dict], rules_path: Optional[str] = None) -> Lis
     """
     Ejecuta la validación sobre una lista de registros.
 
+    Cada regla se evalúa una vez por campo sobre la lista de valores de
+    ese campo; los resultados se escriben de vuelta en los mismos
+    registros, sin armar un DataFrame. Los registros se limpian en sitio;
+    la lista de entrada no debe reutilizarse después de la llamada.
+
     Args:
         records: Registros crudos provenientes de la extracción.
         rules_path: Ruta opcional al archivo YAML de reglas.
@@ -133,15 +135,20 @@ def run_validation(records: List[Dict], rules_path: Optional[str] = None) -> Lis
     rules = load_rules(rules_path)
 
     total = len(records)
-    valid_records = []  # type: List[Dict]
-    discarded = 0
+    keep = [True] * total
 
-    for record in records:
-        result = validate_record(record, rules)
-        if result is None:
-            discarded += 1
-        else:
-            valid_records.append(result)
+    for field_name, rule in rules.items():
+        values = [record.get(field_name) for record in records]
+        valid = validate_values(values, rule)
+        for record, value in zip(records, values):
+            record[field_name] = value
+
+        if rule.get("required", False):
+            # Campo obligatorio no cumple → descartar fila
+            keep = [k and v for k, v in zip(keep, valid)]
+
+    valid_records = [record for record, k in zip(records, keep) if k]
+    discarded = total - len(valid_records)
 
     logger.info(
         "Validación finalizada — recibidos: %d | descartados: %d | válidos: %d",
@@ -2,21 +2,30 @@
 writing.py — Módulo de escritura (persistencia).
 
 Contiene el DatabaseManager y la lógica de inserción con detección
-de duplicados, reutilizando la lógica original de lambda.py.
+de duplicados; el filtrado contra la BD se resuelve en Postgres.
 
 La conexión a la base de datos usa variables de entorno directas
 (la misma BD Postgres que levanta docker-compose para Airflow).
 """
 
+import csv
+import io
 import logging
-from typing import Dict, List, Tuple
+from typing import Dict, Iterable, List, Tuple
 
-import pandas as pd
+import psycopg2
 
 from config import settings
 
 logger = logging.getLogger("ani_scraping.writing")
 
+# Marcador de NULL en el CSV enviado por COPY
+_COPY_NULL = "\\N"
+
+def _columns_sql(columns: List[str]) -> str:
+    """Lista de columnas entre comillas dobles, lista para interpolar en SQL."""
+    return ", ".join(f'"{col}"' for col in columns)
+
 
 # ---------------------------------------------------------------------------
 # DatabaseManager
@@ -29,8 +38,7 @@ class DatabaseManager:
         self.cursor = None
 
     def connect(self) -> bool:
-        import psycopg2
-
+        """Abre la conexión a PostgreSQL."""
         try:
             config = settings.db_config
             self.connection = psycopg2.connect(**config)
@@ -42,10 +50,13 @@ class DatabaseManager:
             return False
 
     def close(self):
+        """Cierra cursor y conexión (una transacción abierta se descarta)."""
         if self.cursor:
             self.cursor.close()
+            self.cursor = None
         if self.connection:
             self.connection.close()
+            self.connection = None
         logger.info("Conexión a BD cerrada.")
 
     def execute_query(self, query: str, params=None):
@@ -61,22 +72,40 @@ class DatabaseManager:
         self.cursor.execute(ddl)
         self.connection.commit()
 
-    def bulk_insert(self, df: pd.DataFrame, table_name: str) -> int:
-        """Realiza una inserción masiva de un DataFrame a la tabla especificada."""
+    def copy_rows(
+        self,
+        rows: Iterable[Tuple],
+        columns: List[str],
+        table_name: str,
+        commit: bool = True,
+    ) -> int:
+        """
+        Inserta tuplas con COPY FROM STDIN.
+
+        Las filas se serializan a un CSV en memoria a medida que se consumen
+        y se envían en un único flujo, evitando un round-trip por fila como
+        en executemany. Los None se envían como NULL.
+        """
         if not self.connection or not self.cursor:
             raise RuntimeError("Base de datos no conectada")
 
         try:
-            df = df.astype(object).where(pd.notnull(df), None)
-            columns_for_sql = ", ".join([f'"{col}"' for col in df.columns])
-            placeholders = ", ".join(["%s"] * len(df.columns))
-
-            insert_query = f"INSERT INTO {table_name} ({columns_for_sql}) VALUES ({placeholders})"
-            records_to_insert = [tuple(x) for x in df.values]
-
-            self.cursor.executemany(insert_query, records_to_insert)
-            self.connection.commit()
-            return len(df)
+            buf = io.StringIO()
+            writer = csv.writer(buf)
+            row_count = 0
+            for row in rows:
+                writer.writerow([_COPY_NULL if value is None else value for value in row])
+                row_count += 1
+            buf.seek(0)
+
+            copy_query = (
+                f"COPY {table_name} ({_columns_sql(columns)}) "
+                f"FROM STDIN WITH (FORMAT csv, NULL '{_COPY_NULL}')"
+            )
+            self.cursor.copy_expert(copy_query, buf)
+            if commit:
+                self.connection.commit()
+            return row_count
         except Exception as e:
             self.connection.rollback()
             raise RuntimeError(f"Error insertando en {table_name}: {e}") from e
@@ -86,18 +115,27 @@ class DatabaseManager:
 # Inserción de componentes de regulación
 # ---------------------------------------------------------------------------
 def insert_regulations_component(db_manager: DatabaseManager, new_ids: List) -> Tuple[int, str]:
-    """Inserta los componentes de las regulaciones."""
+    """
+    Inserta los componentes de las regulaciones.
+
+    Los ids viajan como un único parámetro array y Postgres los expande
+    con UNNEST: una sola sentencia sin importar cuántos ids haya.
+    """
     if not new_ids:
         return 0, "No se proporcionaron IDs de regulación nuevos"
 
     try:
-        id_rows = pd.DataFrame(new_ids, columns=["regulations_id"])
-        id_rows["components_id"] = 7
-
-        inserted_count = db_manager.bulk_insert(id_rows, "regulations_component")
+        db_manager.cursor.execute(
+            "INSERT INTO regulations_component (regulations_id, components_id) "
+            "SELECT id, 7 FROM UNNEST(%s::bigint[]) AS t(id)",
+            (list(new_ids),),
+        )
+        db_manager.connection.commit()
+        inserted_count = db_manager.cursor.rowcount
         return inserted_count, f"Insertados {inserted_count} componentes de regulación"
 
     except Exception as e:
+        db_manager.connection.rollback()
         return 0, f"Error insertando componentes de regulación: {e}"
 
 
@@ -106,149 +144,151 @@ def insert_regulations_component(db_manager: DatabaseManager, new_ids: List) ->
 # ---------------------------------------------------------------------------
 ENTITY_VALUE = "Agencia Nacional de Infraestructura"
 
+# Clave compuesta que identifica una norma (igual al UNIQUE de init.sql)
+DEDUP_KEYS = ["title", "created_at", "external_link"]
+
 
-def insert_new_records(db_manager: DatabaseManager, df: pd.DataFrame, entity: str) -> Tuple[int, str]:
+def _entity_rows(records: Iterable[Dict], entities: List[str], columns: List[str]) -> Tuple[List[Tuple], int, int]:
     """
-    Inserta nuevos registros en la base de datos evitando duplicados.
-    Lógica de dedup idéntica al código original.
+    Arma las filas de las entidades indicadas, listas para COPY.
+
+    Normaliza las columnas de DEDUP_KEYS y omite los duplicados internos
+    del lote (por entidad).
+
+    Returns:
+        (filas, procesados, duplicados_internos)
+    """
+    wanted = set(entities)
+    title_pos, created_at_pos, link_pos = (columns.index(k) for k in DEDUP_KEYS)
+    seen = set()
+    rows = []
+    processed = 0
+    internal_duplicates = 0
+    for record in records:
+        entity = record.get("entity")
+        if entity not in wanted:
+            continue
+        processed += 1
+
+        # Normalización consistente con la comparación en Postgres
+        title = str(record.get("title")).strip()
+        created_at = str(record.get("created_at"))
+        external_link = record.get("external_link")
+        external_link = "" if external_link is None else str(external_link)
+
+        key = (entity, title, created_at, external_link)
+        if key in seen:
+            internal_duplicates += 1
+            continue
+        seen.add(key)
+
+        row = [record.get(col) for col in columns]
+        row[title_pos] = title
+        row[created_at_pos] = created_at
+        row[link_pos] = external_link
+        rows.append(tuple(row))
+
+    return rows, processed, internal_duplicates
+
+
+def insert_new_records(db_manager: DatabaseManager, records: List[Dict], entity: str) -> Tuple[int, str]:
+    """Inserta nuevos registros de una entidad evitando duplicados."""
+    return insert_new_records_bulk(db_manager, records, [entity])
+
+
+def insert_new_records_bulk(db_manager: DatabaseManager, records: List[Dict], entities: List[str]) -> Tuple[int, str]:
+    """
+    Inserta nuevos registros de varias entidades evitando duplicados.
+
+    Los registros de todas las entidades se serializan directamente a un
+    único COPY sobre una tabla temporal (sin DataFrame intermedio) y el
+    filtrado contra los registros existentes se hace en Postgres con un
+    solo anti-join (INSERT ... SELECT ... WHERE NOT EXISTS ... RETURNING id),
+    sin traer las filas existentes al cliente ni repetir el proceso por
+    entidad.
     """
     regulations_table_name = "regulations"
+    staging_table_name = "tmp_regulations"
+    entity_label = ", ".join(entities)
 
     try:
-        # 1. OBTENER REGISTROS EXISTENTES
-        query = """
-            SELECT title, created_at, entity, COALESCE(external_link, '') as external_link
-            FROM {}
-            WHERE entity = %s
-        """.format(regulations_table_name)
-
-        existing_records = db_manager.execute_query(query, (entity,))
-
-        if not existing_records:
-            db_df = pd.DataFrame(columns=["title", "created_at", "entity", "external_link"])
-        else:
-            db_df = pd.DataFrame(existing_records, columns=["title", "created_at", "entity", "external_link"])
-
-        logger.info("Registros existentes en BD para %s: %d", entity, len(db_df))
+        if not records:
+            return 0, f"Sin registros para entidad {entity_label}"
 
-        # 2. PREPARAR DATAFRAME DE LA ENTIDAD
-        entity_df = df[df["entity"] == entity].copy()
+        # Todos los registros validados comparten las mismas columnas
+        columns = list(records[0].keys())
+        columns_for_sql = _columns_sql(columns)
 
-        if entity_df.empty:
-            return 0, f"Sin registros para entidad {entity}"
-
-        logger.info("Registros a procesar para %s: %d", entity, len(entity_df))
-
-        # 3. NORMALIZAR DATOS PARA COMPARACIÓN CONSISTENTE
-        if not db_df.empty:
-            db_df["created_at"] = db_df["created_at"].astype(str)
-            db_df["external_link"] = db_df["external_link"].fillna("").astype(str)
-            db_df["title"] = db_df["title"].astype(str).str.strip()
-
-        entity_df["created_at"] = entity_df["created_at"].astype(str)
-        entity_df["external_link"] = entity_df["external_link"].fillna("").astype(str)
-        entity_df["title"] = entity_df["title"].astype(str).str.strip()
-
-        # 4. IDENTIFICAR DUPLICADOS
+        # 1. CARGAR CANDIDATOS EN TABLA TEMPORAL (misma transacción)
+        #    Se filtra la entidad, se normaliza y se quitan los duplicados
+        #    internos antes de escribir las filas en el COPY.
         logger.info("=== INICIANDO VALIDACIÓN DE DUPLICADOS ===")
-        duplicates_found = 0
-        internal_duplicates = 0
-
-        if db_df.empty:
-            new_records = entity_df.copy()
-            logger.info("No hay registros existentes, todos son nuevos")
-        else:
-            entity_df["unique_key"] = (
-                entity_df["title"] + "|" +
-                entity_df["created_at"] + "|" +
-                entity_df["external_link"]
-            )
-            db_df["unique_key"] = (
-                db_df["title"] + "|" +
-                db_df["created_at"] + "|" +
-                db_df["external_link"]
-            )
+        rows, processed, internal_duplicates = _entity_rows(records, entities, columns)
+        if processed == 0:
+            return 0, f"Sin registros para entidad {entity_label}"
 
-            existing_keys = set(db_df["unique_key"])
-            entity_df["is_duplicate"] = entity_df["unique_key"].isin(existing_keys)
-
-            new_records = entity_df[~entity_df["is_duplicate"]].copy()
-            duplicates_found = len(entity_df) - len(new_records)
-
-            if duplicates_found > 0:
-                logger.info("Duplicados encontrados: %d", duplicates_found)
-
-        # 5. REMOVER DUPLICADOS INTERNOS
-        before = len(new_records)
-        new_records = new_records.drop_duplicates(
-            subset=["title", "created_at", "external_link"],
-            keep="first",
-        )
-        internal_duplicates = before - len(new_records)
+        logger.info("Registros a procesar para %s: %d", entity_label, processed)
         if internal_duplicates > 0:
             logger.info("Duplicados internos removidos: %d", internal_duplicates)
 
-        total_duplicates = duplicates_found + internal_duplicates
-        logger.info("=== DUPLICADOS IDENTIFICADOS: %d ===", total_duplicates)
-
-        if new_records.empty:
-            return 0, f"Sin registros nuevos para {entity} tras validación de duplicados"
+        # La carga es idempotente (se re-ejecuta sin duplicar), así que no
+        # hace falta esperar el flush del WAL al hacer commit. SET LOCAL
+        # solo afecta a esta transacción. La tabla temporal ya no genera WAL.
+        db_manager.cursor.execute("SET LOCAL synchronous_commit = off")
+        db_manager.cursor.execute(
+            f"CREATE TEMP TABLE {staging_table_name} ON COMMIT DROP AS "
+            f"SELECT {columns_for_sql} FROM {regulations_table_name} WITH NO DATA"
+        )
+        candidates = db_manager.copy_rows(rows, columns, staging_table_name, commit=False)
+
+        # 2. INSERTAR SOLO LOS QUE NO EXISTEN (anti-join en Postgres)
+        logger.info("=== INSERTANDO HASTA %d REGISTROS ===", candidates)
+        insert_query = f"""
+            INSERT INTO {regulations_table_name} ({columns_for_sql})
+            SELECT {columns_for_sql} FROM {staging_table_name} t
+            WHERE NOT EXISTS (
+                SELECT 1 FROM {regulations_table_name} r
+                WHERE r.entity = t.entity
+                  AND r.title = t.title
+                  AND r.created_at = t.created_at
+                  AND COALESCE(r.external_link, '') = COALESCE(t.external_link, '')
+            )
+            ON CONFLICT DO NOTHING
+            RETURNING id
+        """
+        new_ids = [row[0] for row in db_manager.execute_query(insert_query)]
+        db_manager.connection.commit()
 
-        # 6. LIMPIAR COLUMNAS AUXILIARES
-        for col in ("unique_key", "is_duplicate"):
-            if col in new_records.columns:
-                new_records = new_records.drop(columns=[col])
+        total_rows = len(new_ids)
+        duplicates_found = candidates - total_rows
+        if duplicates_found > 0:
+            logger.info("Duplicados encontrados: %d", duplicates_found)
 
-        logger.info("Registros finales a insertar: %d", len(new_records))
+        total_duplicates = duplicates_found + internal_duplicates
+        logger.info("=== DUPLICADOS IDENTIFICADOS: %d ===", total_duplicates)
 
-        # 7. INSERTAR
-        try:
-            logger.info("=== INSERTANDO %d REGISTROS ===", len(new_records))
-            total_rows = db_manager.bulk_insert(new_records, regulations_table_name)
-
-            if total_rows == 0:
-                return 0, f"No se insertaron registros para {entity}"
-
-            logger.info("Registros insertados exitosamente: %d", total_rows)
-
-        except Exception as insert_error:
-            logger.error("Error en inserción: %s", insert_error)
-            if "duplicate" in str(insert_error).lower() or "unique" in str(insert_error).lower():
-                logger.warning("Error de duplicados — algunos registros ya existían")
-                return 0, f"Algunos registros de {entity} eran duplicados y se omitieron"
-            raise
-
-        # 8. OBTENER IDS DE REGISTROS INSERTADOS
-        new_ids_query = f"""
-            SELECT id FROM {regulations_table_name}
-            WHERE entity = %s
-            ORDER BY id DESC
-            LIMIT %s
-        """
-        new_ids_result = db_manager.execute_query(new_ids_query, (entity, total_rows))
-        new_ids = [row[0] for row in new_ids_result]
+        if total_rows == 0:
+            return 0, f"Sin registros nuevos para {entity_label} tras validación de duplicados"
 
-        logger.info("IDs obtenidos: %d", len(new_ids))
+        logger.info("Registros insertados exitosamente: %d", total_rows)
 
-        # 9. INSERTAR COMPONENTES
+        # 3. INSERTAR COMPONENTES
         inserted_comp = 0
         comp_msg = ""
-        if new_ids:
-            try:
-                inserted_comp, comp_msg = insert_regulations_component(db_manager, new_ids)
-                logger.info("Componentes: %s", comp_msg)
-            except Exception as comp_error:
-                logger.error("Error insertando componentes: %s", comp_error)
-                comp_msg = f"Error insertando componentes: {comp_error}"
-
-        # 10. RESULTADO
+        try:
+            inserted_comp, comp_msg = insert_regulations_component(db_manager, new_ids)
+            logger.info("Componentes: %s", comp_msg)
+        except Exception as comp_error:
+            logger.error("Error insertando componentes: %s", comp_error)
+            comp_msg = f"Error insertando componentes: {comp_error}"
+
+        # 4. RESULTADO
         stats = (
-            f"Procesados: {len(entity_df)} | "
-            f"Existentes: {len(db_df)} | "
+            f"Procesados: {processed} | "
             f"Duplicados omitidos: {total_duplicates} | "
             f"Nuevos insertados: {total_rows}"
         )
-        message = f"Entidad {entity}: {stats}. {comp_msg}"
+        message = f"Entidad {entity_label}: {stats}. {comp_msg}"
         logger.info("=== RESULTADO FINAL ===")
         logger.info(message)
 
@@ -257,10 +297,8 @@ def insert_new_records(db_manager: DatabaseManager, df: pd.DataFrame, entity: st
     except Exception as e:
         if hasattr(db_manager, "connection") and db_manager.connection:
             db_manager.connection.rollback()
-        error_msg = f"Error procesando entidad {entity}: {e}"
-        logger.error("ERROR CRÍTICO: %s", error_msg)
-        import traceback
-        logger.error(traceback.format_exc())
+        error_msg = f"Error procesando entidad {entity_label}: {e}"
+        logger.exception("ERROR CRÍTICO: %s", error_msg)
         return 0, error_msg
 
 
@@ -281,15 +319,14 @@ def run_writing(records: List[Dict]) -> int:
         logger.warning("No hay registros para escribir.")
         return 0
 
-    df = pd.DataFrame(records)
-    logger.info("Total de registros a escribir: %d", len(df))
+    logger.info("Total de registros a escribir: %d", len(records))
 
     db_manager = DatabaseManager()
     if not db_manager.connect():
         raise RuntimeError("No se pudo conectar a la base de datos")
 
     try:
-        inserted_count, message = insert_new_records(db_manager, df, ENTITY_VALUE)
+        inserted_count, message = insert_new_records(db_manager, records, ENTITY_VALUE)
         logger.info("Escritura finalizada — filas insertadas: %d", inserted_count)
         return inserted_count
     finally:
@@ -0,0 +1,6 @@
+"""Configuración común de pytest: los módulos de src/ se importan sin paquete."""
+
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
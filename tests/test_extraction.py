@@ -0,0 +1,72 @@
+"""Pruebas de extraction.scrape_page sobre una página de listado guardada."""
+
+from pathlib import Path
+
+import pytest
+import requests
+
+import extraction
+
+FIXTURES = Path(__file__).resolve().parent / "fixtures"
+
+
+def _response(
+    body: bytes, content_type: str = "text/html; charset=utf-8"
+) -> requests.Response:
+    response = requests.Response()
+    response.status_code = 200
+    response._content = body
+    response.headers["Content-Type"] = content_type
+    response.encoding = requests.utils.get_encoding_from_headers(response.headers)
+    return response
+
+
+@pytest.fixture
+def listing_page(monkeypatch):
+    body = (FIXTURES / "listing_page.html").read_bytes()
+    monkeypatch.setattr(
+        extraction._SESSION, "get", lambda url, timeout: _response(body)
+    )
+
+
+def test_scrape_page_rows_of_first_tbody(listing_page):
+    records = extraction.scrape_page(0)
+
+    assert [r["title"] for r in records] == [
+        "Resolución 20241234 de 2024",
+        "Decreto 145 de 2023",
+    ]
+    assert [r["external_link"] for r in records] == [
+        "https://www.ani.gov.co/sites/default/files/resolucion_20241234.pdf",
+        "https://www.ani.gov.co/decreto-145-2023",
+    ]
+    assert [r["created_at"] for r in records] == ["2024-03-05", "2023-09-07"]
+    assert [r["rtype_id"] for r in records] == [15, 14]
+
+
+def test_scrape_page_keeps_nested_table_in_row(listing_page):
+    first = extraction.scrape_page(0)[0]
+
+    # La tabla anidada en la celda sigue siendo parte del resumen de la fila
+    # (los fragmentos se unen sin separador, como get_text(strip=True))
+    assert first["summary"] == (
+        "Por la cual seadoptael manual de interventoríaanexo 1formato de seguimiento"
+    )
+
+
+def test_scrape_page_without_table(monkeypatch):
+    body = b"<html><body><p>Sin resultados</p></body></html>"
+    monkeypatch.setattr(
+        extraction._SESSION, "get", lambda url, timeout: _response(body)
+    )
+
+    assert extraction.scrape_page(0) == []
+
+
+def test_scrape_page_defaults_to_utf8_without_charset(monkeypatch):
+    body = (FIXTURES / "listing_page.html").read_bytes()
+    monkeypatch.setattr(
+        extraction._SESSION, "get", lambda url, timeout: _response(body, "text/html")
+    )
+
+    assert extraction.scrape_page(0)[0]["title"] == "Resolución 20241234 de 2024"
@@ -0,0 +1,168 @@
+"""Pruebas de validation.run_validation con las reglas de configs/validation_rules.yaml."""
+
+import random
+import re
+
+import pytest
+import yaml
+
+from config import settings
+from validation import run_validation
+
+
+def _record(**overrides):
+    record = {
+        "created_at": "2024-03-05",
+        "update_at": "2024-03-06 10:00:00",
+        "is_active": True,
+        "title": "Resolución 20241234 de 2024",
+        "gtype": "link",
+        "entity": "Agencia Nacional de Infraestructura",
+        "external_link": "https://www.ani.gov.co/resolucion-20241234",
+        "rtype_id": 15,
+        "summary": "Adopta el manual de interventoría",
+        "classification_id": 13,
+    }
+    record.update(overrides)
+    return record
+
+
+def test_valid_record_passes_unchanged():
+    record = _record()
+
+    assert run_validation([record]) == [_record()]
+
+
+def test_required_field_failures_discard_the_row():
+    records = [
+        _record(title=None),
+        _record(title="x" * 101),
+        _record(created_at="05/03/2024"),
+        _record(external_link="/relativo"),
+        _record(entity=None),
+        _record(title="Decreto 145 de 2023"),
+    ]
+
+    validated = run_validation(records)
+
+    assert [r["title"] for r in validated] == ["Decreto 145 de 2023"]
+
+
+def test_mixed_types_are_cast_or_nulled():
+    records = [
+        _record(rtype_id="15", classification_id=7.5, summary=None),
+        _record(rtype_id="abc", classification_id=None, is_active=0),
+    ]
+
+    first, second = run_validation(records)
+
+    assert first["rtype_id"] == 15 and type(first["rtype_id"]) is int
+    assert first["classification_id"] == 7 and type(first["classification_id"]) is int
+    assert first["summary"] is None
+    # Un campo opcional que no cumple queda como None sin descartar la fila
+    assert second["rtype_id"] is None
+    assert second["classification_id"] is None
+    assert second["is_active"] is False
+
+
+def test_missing_rule_column_is_filled_with_none():
+    record = _record()
+    del record["gtype"]
+
+    (validated,) = run_validation([record])
+
+    assert validated["gtype"] is None
+
+
+def test_records_are_cleaned_in_place():
+    records = [_record(rtype_id="15"), _record(title=None)]
+    first = records[0]
+
+    validated = run_validation(records)
+
+    assert validated[0] is first
+    assert first["rtype_id"] == 15
+
+
+# ---------------------------------------------------------------------------
+# Equivalencia con la validación registro a registro original
+# ---------------------------------------------------------------------------
+_TYPES = {"str": str, "int": int, "float": float, "bool": bool}
+
+
+def _reference_validation(records, rules):
+    """Semántica original: copia de cada registro y re.match por valor."""
+    valid_records = []
+    for record in records:
+        cleaned = dict(record)
+        for field_name, rule in rules.items():
+            value = cleaned.get(field_name)
+            is_valid = value is not None
+            expected_type = _TYPES.get(rule.get("type"))
+            if is_valid and expected_type and not isinstance(value, expected_type):
+                try:
+                    value = expected_type(value)
+                except (ValueError, TypeError):
+                    is_valid = False
+            regex = rule.get("regex")
+            if (
+                is_valid
+                and regex
+                and isinstance(value, str)
+                and not re.match(regex, value)
+            ):
+                is_valid = False
+            if not is_valid:
+                if rule.get("required", False):
+                    cleaned = None
+                    break
+                value = None
+            cleaned[field_name] = value
+        if cleaned is not None:
+            valid_records.append(cleaned)
+    return valid_records
+
+
+_FUZZ_VALUES = [
+    None,
+    "",
+    " ",
+    "abc",
+    "15",
+    "7.5",
+    "2024-03-05",
+    "05/03/2024",
+    "https://www.ani.gov.co/n",
+    "/relativo",
+    "x" * 101,
+    0,
+    1,
+    15,
+    -3,
+    0.0,
+    7.5,
+    True,
+    False,
+    ["lista"],
+]
+
+
+@pytest.mark.parametrize("seed", range(50))
+def test_matches_reference_on_random_batches(seed):
+    with open(settings.validation_rules_path, encoding="utf-8") as f:
+        rules = yaml.safe_load(f)["fields"]
+    rng = random.Random(seed)
+    batch = []
+    for _ in range(rng.randint(0, 40)):
+        record = _record()
+        for field_name in rules:
+            roll = rng.random()
+            if roll < 0.1:
+                record.pop(field_name)
+            elif roll < 0.5:
+                record[field_name] = rng.choice(_FUZZ_VALUES)
+        batch.append(record)
+
+    expected = _reference_validation([dict(r) for r in batch], rules)
+
+    assert run_validation(batch) == expected
@@ -0,0 +1,209 @@
+"""Pruebas de writing.insert_new_records_bulk con un cursor simulado (sin BD)."""
+
+import csv
+import io
+
+from writing import (
+    ENTITY_VALUE,
+    DatabaseManager,
+    insert_new_records,
+    insert_new_records_bulk,
+)
+
+OTHER_ENTITY = "Ministerio de Transporte"
+
+
+class FakeCursor:
+    """Registra las sentencias y el contenido del COPY; RETURNING entrega *new_ids*."""
+
+    def __init__(self, new_ids=(), fail_on_copy=False):
+        self.new_ids = list(new_ids)
+        self.fail_on_copy = fail_on_copy
+        self.statements = []
+        self.copy_sql = None
+        self.copy_rows = None
+        self.rowcount = -1
+        self._result = []
+
+    def execute(self, query, params=None):
+        self.statements.append((" ".join(query.split()), params))
+        if "RETURNING id" in query:
+            self._result = [(new_id,) for new_id in self.new_ids]
+        elif query.startswith("INSERT INTO regulations_component"):
+            self.rowcount = len(params[0])
+
+    def fetchall(self):
+        return self._result
+
+    def copy_expert(self, sql, buf):
+        if self.fail_on_copy:
+            raise ValueError("COPY falló")
+        self.copy_sql = sql
+        self.copy_rows = list(csv.reader(io.StringIO(buf.read())))
+
+
+class FakeConnection:
+    def __init__(self):
+        self.commits = 0
+        self.rollbacks = 0
+
+    def commit(self):
+        self.commits += 1
+
+    def rollback(self):
+        self.rollbacks += 1
+
+
+def _db(cursor):
+    db = DatabaseManager()
+    db.connection = FakeConnection()
+    db.cursor = cursor
+    return db
+
+
+def _record(
+    title,
+    created_at="2024-03-05",
+    external_link="https://www.ani.gov.co/n",
+    **overrides,
+):
+    record = {
+        "created_at": created_at,
+        "update_at": "2024-03-06 10:00:00",
+        "is_active": True,
+        "title": title,
+        "gtype": "link",
+        "entity": ENTITY_VALUE,
+        "external_link": external_link,
+        "rtype_id": 15,
+        "summary": None,
+        "classification_id": 13,
+    }
+    record.update(overrides)
+    return record
+
+
+def _statements(cursor):
+    return [sql for sql, _ in cursor.statements]
+
+
+def test_staging_load_and_anti_join_sql():
+    cursor = FakeCursor(new_ids=[101])
+    db = _db(cursor)
+
+    inserted, _ = insert_new_records(
+        db, [_record("Resolución 1 de 2024")], ENTITY_VALUE
+    )
+
+    assert inserted == 1
+    set_local, create_temp, insert_select, component = _statements(cursor)
+    assert set_local == "SET LOCAL synchronous_commit = off"
+    assert create_temp.startswith("CREATE TEMP TABLE tmp_regulations ON COMMIT DROP AS")
+    assert create_temp.endswith("FROM regulations WITH NO DATA")
+    assert cursor.copy_sql.startswith('COPY tmp_regulations ("created_at", "update_at"')
+    assert insert_select.startswith("INSERT INTO regulations (")
+    assert "FROM tmp_regulations t WHERE NOT EXISTS" in insert_select
+    assert (
+        "COALESCE(r.external_link, '') = COALESCE(t.external_link, '')" in insert_select
+    )
+    assert insert_select.endswith("ON CONFLICT DO NOTHING RETURNING id")
+    assert component.startswith("INSERT INTO regulations_component")
+    assert cursor.statements[-1][1] == ([101],)
+    # Anti-join y componentes se confirman por separado
+    assert db.connection.commits == 2
+
+
+def test_internal_and_whitespace_padded_duplicates_are_dropped_before_copy():
+    cursor = FakeCursor(new_ids=[101, 102])
+    records = [
+        _record("Resolución 1 de 2024"),
+        _record("  Resolución 1 de 2024  "),
+        _record("Resolución 1 de 2024"),
+        _record("Decreto 2 de 2024", external_link=None),
+        _record("Resolución 1 de 2024", entity=OTHER_ENTITY),
+    ]
+
+    inserted, message = insert_new_records(_db(cursor), records, ENTITY_VALUE)
+
+    assert inserted == 2
+    assert [(row[3], row[6]) for row in cursor.copy_rows] == [
+        ("Resolución 1 de 2024", "https://www.ani.gov.co/n"),
+        ("Decreto 2 de 2024", ""),
+    ]
+    # summary=None viaja como NULL
+    assert {row[8] for row in cursor.copy_rows} == {"\\N"}
+    assert "Procesados: 4 | Duplicados omitidos: 2 | Nuevos insertados: 2" in message
+
+
+def test_existing_duplicates_are_counted_from_returning():
+    # Postgres solo devuelve el id de la fila que no existía
+    cursor = FakeCursor(new_ids=[103])
+    records = [
+        _record("Resolución 1 de 2024"),
+        _record("Resolución 2 de 2024"),
+        _record("Decreto 3 de 2024"),
+    ]
+
+    inserted, message = insert_new_records(_db(cursor), records, ENTITY_VALUE)
+
+    assert inserted == 1
+    assert len(cursor.copy_rows) == 3
+    assert "Procesados: 3 | Duplicados omitidos: 2 | Nuevos insertados: 1" in message
+    assert cursor.statements[-1][1] == ([103],)
+
+
+def test_all_existing_skips_components():
+    cursor = FakeCursor(new_ids=[])
+    db = _db(cursor)
+
+    inserted, message = insert_new_records(
+        db, [_record("Resolución 1 de 2024")], ENTITY_VALUE
+    )
+
+    assert inserted == 0
+    assert "Sin registros nuevos" in message
+    assert not any(
+        sql.startswith("INSERT INTO regulations_component")
+        for sql in _statements(cursor)
+    )
+
+
+def test_bulk_loads_several_entities_in_one_copy():
+    cursor = FakeCursor(new_ids=[101, 102])
+    records = [
+        _record("Resolución 1 de 2024"),
+        _record("Resolución 1 de 2024", entity=OTHER_ENTITY),
+    ]
+
+    inserted, _ = insert_new_records_bulk(
+        _db(cursor), records, [ENTITY_VALUE, OTHER_ENTITY]
+    )
+
+    assert inserted == 2
+    assert [row[5] for row in cursor.copy_rows] == [ENTITY_VALUE, OTHER_ENTITY]
+
+
+def test_no_records_for_entity_sends_no_sql():
+    cursor = FakeCursor()
+
+    inserted, message = insert_new_records(
+        _db(cursor), [_record("x", entity=OTHER_ENTITY)], ENTITY_VALUE
+    )
+
+    assert inserted == 0
+    assert message == f"Sin registros para entidad {ENTITY_VALUE}"
+    assert cursor.statements == []
+
+
+def test_copy_failure_rolls_back():
+    cursor = FakeCursor(fail_on_copy=True)
+    db = _db(cursor)
+
+    inserted, message = insert_new_records(
+        db, [_record("Resolución 1 de 2024")], ENTITY_VALUE
+    )
+
+    assert inserted == 0
+    assert message.startswith(f"Error procesando entidad {ENTITY_VALUE}")
+    assert db.connection.rollbacks >= 1
+    assert db.connection.commits == 0